@@ -0,0 +1,853 @@
+from flask import Flask, request, jsonify
+from flask_cors import CORS
+import click
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+import requests
+from requests.adapters import HTTPAdapter
+import orjson
+import ijson
+import io
+import logging
+import os
+import queue
+import tempfile
+import time
+import threading
+import uuid
+import zlib
+import MySQLdb
+import MySQLdb.cursors
+from MySQLdb.constants import CLIENT, FIELD_TYPE
+from MySQLdb.converters import conversions
+from dotenv import load_dotenv
+from dbutils.pooled_db import PooledDB
+from azure.core.pipeline.transport import RequestsTransport
+from azure.storage.blob import BlobBlock, BlobServiceClient
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+# Load environment variables
+load_dotenv()
+
+app = Flask(__name__)
+CORS(app)
+
+# Logging Configuration
+logging.basicConfig(level=logging.DEBUG)
+
+# AWS S3 Configuration
+AWS_ACCESS_KEY = os.getenv('AWS_ACCESS_KEY')
+AWS_SECRET_KEY = os.getenv('AWS_SECRET_KEY')
+S3_BUCKET = os.getenv('S3_BUCKET')
+AWS_REGION = os.getenv('AWS_REGION', 'ap-southeast-2')
+
+# Keep HTTPS connections to S3 alive and pooled across requests; the pool
+# covers the concurrent multipart uploads below
+S3_CLIENT_CONFIG = Config(
+    max_pool_connections=32,
+    tcp_keepalive=True,
+    retries={'mode': 'adaptive', 'max_attempts': 5}
+)
+
+# Multipart settings for S3 uploads; bodies under the threshold use a single PUT
+S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=8,
+    use_threads=True
+)
+
+# Azure Blob Storage Configuration
+
+AZURE_STORAGE_CONNECTION_STRING = ''
+AZURE_CONTAINER_NAME = ''
+
+# S3 -> Azure migration pipeline: size of each staged block, number of
+# downloaded blocks allowed to wait for upload, and concurrent block uploads
+MIGRATION_BLOCK_SIZE = 4 * 1024 * 1024
+MIGRATION_QUEUE_SIZE = 4
+MIGRATION_UPLOAD_WORKERS = 4
+
+# MySQL Database Configuration
+MYSQL_HOST = os.getenv('MYSQL_HOST', 'localhost')
+MYSQL_USER = os.getenv('MYSQL_USER', 'root')
+MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD', '')
+MYSQL_DB = os.getenv('MYSQL_DB', 'transfer')
+
+# Decode DECIMAL columns straight to float so fetched rows can be encoded
+# to JSON without a per-value conversion in Python
+MYSQL_CONVERSIONS = conversions.copy()
+MYSQL_CONVERSIONS[FIELD_TYPE.DECIMAL] = float
+MYSQL_CONVERSIONS[FIELD_TYPE.NEWDECIMAL] = float
+
+# SQL statements used by /process-and-upload, built once at import time.
+# Inserts upsert on policy_id so re-uploading a policy updates it in place.
+POLICY_INSERT_SQL = '''
+    INSERT INTO policy (
+        policy_id, policy_type, base_premium,
+        vehicle_damage, risk_factor, discount, branch_id
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        policy_type = VALUES(policy_type),
+        base_premium = VALUES(base_premium),
+        vehicle_damage = VALUES(vehicle_damage),
+        risk_factor = VALUES(risk_factor),
+        discount = VALUES(discount),
+        branch_id = VALUES(branch_id)
+'''
+
+CUSTOMER_INSERT_SQL = '''
+    INSERT INTO customer_info (
+        policy_id, name, age, address
+    ) VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        name = VALUES(name),
+        age = VALUES(age),
+        address = VALUES(address)
+'''
+
+VEHICLE_INSERT_SQL = '''
+    INSERT INTO vehicle_info (
+        policy_id, make, model, year, vehicle_damage
+    ) VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        make = VALUES(make),
+        model = VALUES(model),
+        year = VALUES(year),
+        vehicle_damage = VALUES(vehicle_damage)
+'''
+
+COVERAGE_INSERT_SQL = '''
+    INSERT INTO coverage_info (
+        policy_id, liability, collision, comprehensive, discount
+    ) VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        liability = VALUES(liability),
+        collision = VALUES(collision),
+        comprehensive = VALUES(comprehensive),
+        discount = VALUES(discount)
+'''
+
+PREMIUM_SELECT_SQL = '''
+    SELECT
+        policy_id,
+        policy_type,
+        base_premium,
+        vehicle_damage,
+        risk_factor,
+        discount,
+        calculated_premium,
+        insurance_granted
+    FROM policy
+'''
+
+# JSON keys for each PREMIUM_SELECT_SQL row, in column order
+POLICY_FIELDS = (
+    'policy_id',
+    'policy_type',
+    'base_premium',
+    'vehicle_damage',
+    'risk_factor',
+    'discount',
+    'calculated_premium',
+    'insurance_granted'
+)
+
+# Initialize AWS S3 client
+try:
+    s3_client = boto3.client(
+        's3',
+        aws_access_key_id=AWS_ACCESS_KEY,
+        aws_secret_access_key=AWS_SECRET_KEY,
+        region_name=AWS_REGION,
+        config=S3_CLIENT_CONFIG
+    )
+    logging.info("AWS S3 client initialized successfully.")
+except Exception as e:
+    logging.error(f"Error initializing AWS S3 client: {str(e)}")
+    s3_client = None
+
+# Initialize Azure Blob Storage client
+try:
+    # Share one pooled HTTP session so block uploads reuse TLS connections
+    azure_session = requests.Session()
+    azure_session.mount('https://', HTTPAdapter(pool_maxsize=32))
+    azure_transport = RequestsTransport(
+        session=azure_session,
+        connection_timeout=5,
+        read_timeout=60
+    )
+    blob_service_client = BlobServiceClient.from_connection_string(
+        AZURE_STORAGE_CONNECTION_STRING,
+        transport=azure_transport
+    )
+    logging.info("Azure Blob Storage client initialized successfully.")
+except Exception as e:
+    logging.error(f"Error initializing Azure Blob Storage client: {str(e)}")
+    blob_service_client = None
+
+# Initialize MySQL connection pool. No connections are opened up front
+# (mincached=0): each one is created on first use, so a MySQL outage while the
+# worker boots only fails the requests made during the outage.
+# DBUtils transparently reconnects and retries a statement that fails outside
+# a transaction, so every write path calls connection.begin() first; errors
+# during writes are then raised rather than retried on a fresh connection.
+try:
+    mysql_pool = PooledDB(
+        creator=MySQLdb,
+        mincached=0,
+        maxcached=8,
+        maxconnections=32,
+        host=MYSQL_HOST,
+        user=MYSQL_USER,
+        passwd=MYSQL_PASSWORD,
+        db=MYSQL_DB,
+        conv=MYSQL_CONVERSIONS,
+        autocommit=False
+    )
+    logging.info("MySQL connection pool initialized successfully.")
+except Exception as e:
+    logging.error(f"Error initializing MySQL connection pool: {str(e)}")
+    mysql_pool = None
+
+# Number of policies buffered before the pending rows are flushed with
+# executemany(); mysqlclient rewrites each call into a single multi-row INSERT,
+# so this keeps statements below max_allowed_packet
+INSERT_BATCH_SIZE = 10000
+
+# Insert the buffered rows with one multi-row INSERT per table, then clear them
+def flush_policy_rows(cursor, policy_rows, customer_rows, vehicle_rows, coverage_rows):
+    if not policy_rows:
+        return
+
+    cursor.executemany(POLICY_INSERT_SQL, policy_rows)
+    cursor.executemany(CUSTOMER_INSERT_SQL, customer_rows)
+    cursor.executemany(VEHICLE_INSERT_SQL, vehicle_rows)
+    cursor.executemany(COVERAGE_INSERT_SQL, coverage_rows)
+
+    policy_rows.clear()
+    customer_rows.clear()
+    vehicle_rows.clear()
+    coverage_rows.clear()
+
+# Number of rows pulled per fetchmany() when streaming the premium SELECT
+FETCH_BATCH_SIZE = 1000
+
+# Encode the premium SELECT as a JSON array, one fetchmany() batch at a time,
+# so the result set is never held in memory as a whole
+def iter_policies_json(cursor):
+    yield b'['
+    separator = b'\n'
+    while True:
+        rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+        if not rows:
+            break
+
+        # Join the encoded rows once per batch rather than concatenating
+        # each row with its separator first
+        yield separator
+        yield b',\n'.join([orjson.dumps(dict(zip(POLICY_FIELDS, row))) for row in rows])
+        separator = b',\n'
+    yield b'\n]'
+
+# Compression level for the exported policy JSON; 3 is close to the best
+# speed/ratio trade-off for text
+EXPORT_GZIP_LEVEL = 3
+
+# Gzip an iterator of bytes chunks incrementally
+def iter_gzip(chunks):
+    # wbits=31 selects the gzip container instead of a raw zlib stream
+    compressor = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+# Read-only file object over an iterator of bytes chunks, so generated
+# content can be handed to upload_fileobj without building it in memory
+class IterableStream(io.RawIOBase):
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = memoryview(b'')
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._pending = memoryview(chunk)
+
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+# Copy an S3 StreamingBody into a block blob, downloading the next block from
+# S3 while earlier blocks are still being staged to Azure
+def pipe_s3_to_blob(body, blob_client):
+    blocks = queue.Queue(maxsize=MIGRATION_QUEUE_SIZE)
+    block_list = []
+    errors = []
+
+    def stage_blocks():
+        while True:
+            item = blocks.get()
+            if item is None:
+                return
+            # Keep draining after a failure so the producer never blocks
+            if errors:
+                continue
+            block_id, chunk = item
+            try:
+                blob_client.stage_block(block_id, chunk)
+            except Exception as e:
+                errors.append(e)
+
+    workers = [threading.Thread(target=stage_blocks, daemon=True) for _ in range(MIGRATION_UPLOAD_WORKERS)]
+    for worker in workers:
+        worker.start()
+
+    try:
+        for index, chunk in enumerate(body.iter_chunks(MIGRATION_BLOCK_SIZE)):
+            if errors:
+                break
+            # Block ids must all have the same length within a blob
+            block_id = f"{index:08d}"
+            block_list.append(BlobBlock(block_id=block_id))
+            blocks.put((block_id, chunk))
+    finally:
+        # Release the S3 connection even if the copy stopped part-way through
+        body.close()
+        for _ in workers:
+            blocks.put(None)
+        for worker in workers:
+            worker.join()
+
+    if errors:
+        raise errors[0]
+
+    blob_client.commit_block_list(block_list)
+
+# Database connection context manager
+@contextmanager
+def db_connection():
+    connection = None
+    try:
+        if not mysql_pool:
+            raise RuntimeError("MySQL connection pool not initialized")
+
+        connection = mysql_pool.connection()
+        yield connection
+    except Exception as e:
+        logging.error(f"Error connecting to MySQL: {str(e)}")
+        raise e
+    finally:
+        # Returns the connection to the pool rather than closing the socket
+        if connection:
+            connection.close()
+
+# Generated columns of the policy table, shared by CREATE TABLE and by the
+# upgrade of policy tables created before the columns existed
+CALCULATED_PREMIUM_COLUMN_SQL = '''
+    calculated_premium DECIMAL(12, 2) AS (
+        base_premium
+        + (vehicle_damage *
+           CASE risk_factor
+               WHEN 'low' THEN 1.0
+               WHEN 'medium' THEN 1.5
+               WHEN 'high' THEN 2.0
+               ELSE 1.0
+           END)
+        - (base_premium * (discount / 100))
+    ) STORED
+'''
+
+INSURANCE_GRANTED_COLUMN_SQL = '''
+    insurance_granted VARCHAR(10) AS (
+        CASE
+            WHEN calculated_premium < 10000
+            AND risk_factor IN ('low', 'medium')
+            THEN 'Granted'
+            ELSE 'Rejected'
+        END
+    ) STORED
+'''
+
+# information_schema lookups that keep the schema upgrade steps idempotent
+def column_exists(cursor, table, column):
+    cursor.execute('''
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    ''', (table, column))
+    return cursor.fetchone()[0] > 0
+
+def index_exists(cursor, table, index):
+    cursor.execute('''
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+    ''', (table, index))
+    return cursor.fetchone()[0] > 0
+
+# Bring tables created by an earlier create_tables() up to the current schema.
+# Each step checks information_schema first, so re-running it is a no-op.
+def upgrade_tables(cursor):
+    # Stored premium and decision columns on policy
+    if not column_exists(cursor, 'policy', 'calculated_premium'):
+        cursor.execute(f"ALTER TABLE policy ADD COLUMN {CALCULATED_PREMIUM_COLUMN_SQL}")
+    if not column_exists(cursor, 'policy', 'insurance_granted'):
+        cursor.execute(f"ALTER TABLE policy ADD COLUMN {INSURANCE_GRANTED_COLUMN_SQL}")
+    if not index_exists(cursor, 'policy', 'idx_insurance_granted'):
+        cursor.execute("ALTER TABLE policy ADD INDEX idx_insurance_granted (insurance_granted)")
+
+    # Unique policy_id keys that the upserts rely on. Uploads made before the
+    # keys existed may have left duplicates, so those are removed first,
+    # keeping the most recently inserted row of each policy.
+    for table in ('policy', 'customer_info', 'vehicle_info', 'coverage_info'):
+        if not index_exists(cursor, table, 'uk_policy_id'):
+            cursor.execute(f'''
+                DELETE older FROM {table} AS older
+                JOIN {table} AS newer
+                    ON newer.policy_id = older.policy_id AND newer.id > older.id
+            ''')
+            cursor.execute(f"ALTER TABLE {table} ADD UNIQUE KEY uk_policy_id (policy_id)")
+
+# Create MySQL tables. All CREATE statements go to the server in one
+# multi-statement round-trip on a dedicated connection, so pooled connections
+# never have CLIENT.MULTI_STATEMENTS enabled. Errors are raised to the caller.
+def create_tables():
+    connection = MySQLdb.connect(
+        host=MYSQL_HOST,
+        user=MYSQL_USER,
+        passwd=MYSQL_PASSWORD,
+        db=MYSQL_DB,
+        client_flag=CLIENT.MULTI_STATEMENTS
+    )
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'''
+                -- Create policy table
+                CREATE TABLE IF NOT EXISTS policy (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    policy_id VARCHAR(50) NOT NULL,
+                    policy_type VARCHAR(255) NOT NULL,
+                    base_premium DECIMAL(10, 2) NOT NULL,
+                    vehicle_damage DECIMAL(10, 2) NOT NULL,
+                    risk_factor VARCHAR(20) NOT NULL,
+                    discount DECIMAL(5, 2) NOT NULL,
+                    branch_id VARCHAR(10) NOT NULL,
+                    {CALCULATED_PREMIUM_COLUMN_SQL},
+                    {INSURANCE_GRANTED_COLUMN_SQL},
+                    UNIQUE KEY uk_policy_id (policy_id),
+                    INDEX idx_insurance_granted (insurance_granted)
+                );
+
+                -- Create customer_info table
+                CREATE TABLE IF NOT EXISTS customer_info (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    policy_id VARCHAR(50) NOT NULL,
+                    name VARCHAR(255) NOT NULL,
+                    age INT NOT NULL,
+                    address VARCHAR(255) NOT NULL,
+                    UNIQUE KEY uk_policy_id (policy_id)
+                );
+
+                -- Create vehicle_info table
+                CREATE TABLE IF NOT EXISTS vehicle_info (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    policy_id VARCHAR(50) NOT NULL,
+                    make VARCHAR(255) NOT NULL,
+                    model VARCHAR(255) NOT NULL,
+                    year INT NOT NULL,
+                    vehicle_damage DECIMAL(10, 2) NOT NULL,
+                    UNIQUE KEY uk_policy_id (policy_id)
+                );
+
+                -- Create coverage_info table
+                CREATE TABLE IF NOT EXISTS coverage_info (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    policy_id VARCHAR(50) NOT NULL,
+                    liability DECIMAL(10, 2) NOT NULL,
+                    collision DECIMAL(10, 2) NOT NULL,
+                    comprehensive DECIMAL(10, 2) NOT NULL,
+                    discount DECIMAL(5, 2) NOT NULL,
+                    UNIQUE KEY uk_policy_id (policy_id)
+                );
+
+                -- Create background_task table
+                CREATE TABLE IF NOT EXISTS background_task (
+                    task_id CHAR(32) PRIMARY KEY,
+                    status VARCHAR(20) NOT NULL,
+                    message TEXT,
+                    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+                );
+            ''')
+
+            # Step through the remaining statement results so an error in
+            # any of the later statements is raised here
+            while cursor.nextset():
+                pass
+
+            upgrade_tables(cursor)
+
+        connection.commit()
+    finally:
+        connection.close()
+
+    logging.info("MySQL tables created and upgraded successfully.")
+
+# Initialize MySQL tables only when explicitly requested, e.g. from a one-off
+# pre-deploy run, instead of on every gunicorn worker start
+if os.getenv('RUN_MIGRATIONS') == '1':
+    try:
+        create_tables()
+    except Exception as e:
+        logging.error(f"Error creating tables: {str(e)}")
+
+# Pre-deploy migration command: flask --app app create-tables. A failure exits
+# non-zero so the deploy stops instead of running against a broken schema.
+@app.cli.command('create-tables')
+def create_tables_command():
+    try:
+        create_tables()
+    except Exception as e:
+        logging.error(f"Error creating tables: {str(e)}")
+        raise click.ClickException(f"Error creating tables: {str(e)}") from e
+
+# Background tasks: the endpoints accept work, hand it to this executor and
+# return 202 with a task id that can be polled at /task/<task_id>. Task state
+# is kept in the background_task table so any gunicorn worker can answer a poll.
+TASK_WORKERS = 8
+# Tasks one worker process accepts at a time, running or queued; beyond this
+# the endpoints answer 503 rather than queueing unbounded work
+MAX_PENDING_TASKS = 64
+# Attempts at recording a finished task's status before giving up
+TASK_STATUS_ATTEMPTS = 3
+# A task still 'running' after this long is reported as failed, covering tasks
+# whose worker died or whose final status could not be recorded
+TASK_TIMEOUT_SECONDS = 6 * 60 * 60
+# Task rows are kept this long after their last update, then pruned
+TASK_RETENTION_DAYS = 7
+
+task_executor = ThreadPoolExecutor(max_workers=TASK_WORKERS)
+task_slots = threading.BoundedSemaphore(MAX_PENDING_TASKS)
+
+TASK_INSERT_SQL = '''
+    INSERT INTO background_task (task_id, status) VALUES (%s, 'running')
+'''
+
+TASK_UPDATE_SQL = '''
+    UPDATE background_task SET status = %s, message = %s WHERE task_id = %s
+'''
+
+# Rows older than the retention period are finished, or reported as failed by
+# the timeout above, so nobody polls them any more
+TASK_PRUNE_SQL = '''
+    DELETE FROM background_task WHERE updated_at < NOW() - INTERVAL %s DAY
+'''
+TASK_SELECT_SQL = '''
+    SELECT status, message, updated_at < NOW() - INTERVAL %s SECOND AS timed_out
+    FROM background_task WHERE task_id = %s
+'''
+
+# Record the outcome of a finished task
+def set_task_status(task_id, status, message):
+    with db_connection() as connection:
+        connection.begin()
+        with connection.cursor() as cursor:
+            cursor.execute(TASK_UPDATE_SQL, (status, message, task_id))
+        connection.commit()
+
+# Record a task's outcome, retrying so a brief MySQL outage at the end of a
+# long task doesn't leave it 'running'
+def record_task_status(task_id, status, message):
+    for attempt in range(1, TASK_STATUS_ATTEMPTS + 1):
+        try:
+            set_task_status(task_id, status, message)
+            return
+        except Exception as e:
+            logging.error(f"Error recording the status of task {task_id} (attempt {attempt}): {str(e)}")
+            if attempt < TASK_STATUS_ATTEMPTS:
+                time.sleep(2 ** attempt)
+
+# Run a task on the executor, record its outcome and free its slot
+def run_task(task_id, fn, *args):
+    try:
+        try:
+            message = fn(*args)
+        except Exception as e:
+            logging.error(f"Task {task_id} failed: {str(e)}")
+            record_task_status(task_id, 'failed', str(e))
+        else:
+            record_task_status(task_id, 'completed', message)
+    finally:
+        task_slots.release()
+
+# Submit work to the task executor and return its task id, or None when this
+# worker already has MAX_PENDING_TASKS tasks in flight
+def submit_task(fn, *args):
+    if not task_slots.acquire(blocking=False):
+        return None
+
+    try:
+        task_id = uuid.uuid4().hex
+        with db_connection() as connection:
+            connection.begin()
+            with connection.cursor() as cursor:
+                cursor.execute(TASK_PRUNE_SQL, (TASK_RETENTION_DAYS,))
+                cursor.execute(TASK_INSERT_SQL, (task_id,))
+            connection.commit()
+        task_executor.submit(run_task, task_id, fn, *args)
+    except Exception:
+        task_slots.release()
+        raise
+
+    return task_id
+
+# Copy a file from AWS S3 to Azure Blob Storage
+def migrate_s3_file(file_key):
+    # Step 2: Fetch the file from AWS S3
+    try:
+        # The body is left as a StreamingBody so it can be piped into Azure
+        # without buffering the whole object in memory
+        s3_object = s3_client.get_object(Bucket=S3_BUCKET, Key=file_key)
+        logging.info(f"File '{file_key}' opened on AWS S3 successfully.")
+    except Exception as e:
+        logging.error(f"Error fetching file from AWS S3: {str(e)}")
+        raise RuntimeError(f"Error fetching file from AWS S3: {str(e)}") from e
+
+    # Step 3: Upload the file to Azure Blob Storage
+    try:
+        blob_client = blob_service_client.get_blob_client(container=AZURE_CONTAINER_NAME, blob=file_key)
+        pipe_s3_to_blob(s3_object['Body'], blob_client)
+        logging.info(f"File '{file_key}' uploaded to Azure Blob Storage successfully.")
+    except Exception as e:
+        logging.error(f"Error uploading file to Azure Blob Storage: {str(e)}")
+        raise RuntimeError(f"Error uploading file to Azure Blob Storage: {str(e)}") from e
+
+    return f"File '{file_key}' migrated from AWS S3 to Azure Blob Storage successfully!"
+
+# Store uploaded policies in MySQL, then upload the processed policy table to AWS S3
+def process_policies(branches):
+    # Step 2: Database Connection and batched Insertion
+    with db_connection() as connection:
+        # Mark the explicit transaction for DBUtils. Without it, the pooled
+        # cursor transparently reconnects and re-runs a statement that failed
+        # with an OperationalError (e.g. a deadlock), after InnoDB has already
+        # rolled back the earlier batches, and commit() then persists only part
+        # of the upload. Inside begin()/commit() such errors are raised instead.
+        connection.begin()
+
+        with connection.cursor() as cursor:
+            policy_rows = []
+            customer_rows = []
+            vehicle_rows = []
+            coverage_rows = []
+
+            try:
+                for branch in branches:
+                    branch_id = branch.get('branch_id')
+
+                    for policy in branch['policies']:
+                        policy_rows.append((
+                            policy['policy_id'], policy['policy_type'],
+                            policy['base_premium'], policy['vehicle_info']['vehicle_damage'],
+                            policy['risk_factor'], policy['coverage_info']['discount'],
+                            branch_id
+                        ))
+                        customer_rows.append((
+                            policy['policy_id'],
+                            policy['customer_info']['name'],
+                            policy['customer_info']['age'],
+                            policy['customer_info']['address']
+                        ))
+                        vehicle_rows.append((
+                            policy['policy_id'],
+                            policy['vehicle_info']['make'],
+                            policy['vehicle_info']['model'],
+                            policy['vehicle_info']['year'],
+                            policy['vehicle_info']['vehicle_damage']
+                        ))
+                        coverage_rows.append((
+                            policy['policy_id'],
+                            policy['coverage_info']['liability'],
+                            policy['coverage_info']['collision'],
+                            policy['coverage_info']['comprehensive'],
+                            policy['coverage_info']['discount']
+                        ))
+
+                        if len(policy_rows) >= INSERT_BATCH_SIZE:
+                            flush_policy_rows(cursor, policy_rows, customer_rows, vehicle_rows, coverage_rows)
+            except (ijson.JSONError, ValueError) as e:
+                # Nothing has been committed yet, so the partial batch is rolled back
+                connection.rollback()
+                raise ValueError(f"Invalid JSON: {str(e)}") from e
+
+            flush_policy_rows(cursor, policy_rows, customer_rows, vehicle_rows, coverage_rows)
+
+            connection.commit()
+
+        # Step 3: Fetch policies with their stored premium and decision,
+        # using an unbuffered cursor so rows stay on the server until read
+        with connection.cursor(MySQLdb.cursors.SSCursor) as cursor:
+            cursor.execute(PREMIUM_SELECT_SQL)
+
+            # Step 4: Upload Processed Data to AWS S3 as rows are fetched
+            try:
+                s3_client.upload_fileobj(
+                    io.BufferedReader(IterableStream(iter_gzip(iter_policies_json(cursor)))),
+                    S3_BUCKET,
+                    'insurance_data.json.gz',
+                    Config=S3_TRANSFER_CONFIG,
+                    ExtraArgs={'ContentType': 'application/json', 'ContentEncoding': 'gzip'}
+                )
+                logging.info("Step 4: S3 Upload Successful.")
+            except Exception as s3_error:
+                logging.error(f"Error uploading to AWS S3: {str(s3_error)}")
+                raise RuntimeError(f"Error uploading data to AWS S3: {str(s3_error)}") from s3_error
+
+    return "Data successfully stored in MySQL and then uploaded to AWS S3!"
+
+# Yield the branches of an uploaded document one at a time. ijson.items() yields
+# nothing when there is no 'branches' array, so the parse events are watched to
+# reject such documents the way data['branches'] used to.
+def iter_uploaded_branches(upload):
+    found_branches = False
+
+    def events():
+        nonlocal found_branches
+        for prefix, event, value in ijson.parse(upload):
+            if prefix == 'branches' and event == 'start_array':
+                found_branches = True
+            yield prefix, event, value
+
+    yield from ijson.items(events(), 'branches.item')
+
+    if not found_branches:
+        raise ValueError("missing 'branches' array")
+
+# Stream-parse a spooled upload and process it, closing the spool file afterwards
+def process_uploaded_file(upload):
+    try:
+        return process_policies(iter_uploaded_branches(upload))
+    finally:
+        upload.close()
+
+# Endpoint for Azure to request a file from S3
+@app.route('/fetch-from-s3', methods=['POST'])
+def fetch_from_s3():
+    try:
+        # Step 1: Get the file key (name) from Azure's request
+        data = request.get_json()
+        if not data or 'file_key' not in data:
+            return jsonify({"error": "Missing 'file_key' in request"}), 400
+
+        file_key = data['file_key']
+
+        if not s3_client:
+            return jsonify({"error": "AWS S3 client not initialized"}), 500
+
+        if not blob_service_client:
+            return jsonify({"error": "Azure Blob Storage client not initialized"}), 500
+
+        if not mysql_pool:
+            return jsonify({"error": "MySQL connection pool not initialized"}), 500
+
+        task_id = submit_task(migrate_s3_file, file_key)
+        if task_id is None:
+            return jsonify({"error": "Too many tasks in progress, try again later"}), 503
+
+        return jsonify({
+            "message": f"Migration of '{file_key}' accepted.",
+            "task_id": task_id
+        }), 202
+
+    except Exception as e:
+        logging.error(f"Error in /fetch-from-s3: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+# Endpoint for processing and uploading data
+@app.route('/process-and-upload', methods=['POST'])
+def upload_and_process():
+    try:
+        if not s3_client:
+            logging.error("AWS S3 client not initialized.")
+            return jsonify({"error": "AWS S3 client not initialized."}), 500
+
+        if not mysql_pool:
+            logging.error("MySQL connection pool not initialized.")
+            return jsonify({"error": "MySQL connection pool not initialized."}), 500
+
+        # Step 1: Read JSON data from request
+        if 'file' in request.files:
+            # Spool the upload to a temporary file so it outlives the request;
+            # the task then stream-parses it one branch at a time
+            upload = tempfile.TemporaryFile()
+            try:
+                request.files['file'].save(upload)
+                upload.seek(0)
+                task_id = submit_task(process_uploaded_file, upload)
+            except Exception:
+                upload.close()
+                raise
+            # The task closes the spool file; close it here if it never started
+            if task_id is None:
+                upload.close()
+        elif 'jsonData' in request.form:
+            try:
+                branches = orjson.loads(request.form['jsonData'])['branches']
+            except orjson.JSONDecodeError as e:
+                return jsonify({"error": f"Invalid JSON: {str(e)}"}), 400
+            task_id = submit_task(process_policies, branches)
+        else:
+            return jsonify({"error": "No data provided"}), 400
+
+        if task_id is None:
+            return jsonify({"error": "Too many tasks in progress, try again later"}), 503
+
+        return jsonify({
+            "message": "Data accepted for processing.",
+            "task_id": task_id
+        }), 202
+
+    except Exception as e:
+        logging.error(f"Error in /upload-and-process: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+# Endpoint for polling a background task started by one of the endpoints above
+@app.route('/task/<task_id>', methods=['GET'])
+def task_status(task_id):
+    try:
+        with db_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(TASK_SELECT_SQL, (TASK_TIMEOUT_SECONDS, task_id))
+                row = cursor.fetchone()
+
+        if row is None:
+            return jsonify({"error": f"Unknown task '{task_id}'"}), 404
+
+        status, message, timed_out = row
+        if status == 'running' and timed_out:
+            return jsonify({
+                "task_id": task_id,
+                "status": "failed",
+                "error": f"Task did not finish within {TASK_TIMEOUT_SECONDS} seconds"
+            }), 200
+        if status == 'failed':
+            return jsonify({"task_id": task_id, "status": status, "error": message}), 200
+        if status == 'completed':
+            return jsonify({"task_id": task_id, "status": status, "message": message}), 200
+        return jsonify({"task_id": task_id, "status": status}), 200
+
+    except Exception as e:
+        logging.error(f"Error in /task/{task_id}: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+if __name__ == '__main__':
+    app.run(port=5001)
@@ -0,0 +1,20 @@
+# Gunicorn configuration for the Flask backend
+# Run from this directory with: gunicorn app:app
+# Create the MySQL tables once per deploy beforehand: flask --app app create-tables
+
+bind = '0.0.0.0:5001'
+
+# Threaded workers so requests blocked on MySQL, S3 or Azure I/O don't hold
+# up the rest of the worker. Task state lives in MySQL, so a poll of
+# /task/<task_id> can be answered by any worker.
+workers = 4
+worker_class = 'gthread'
+threads = 8
+
+# Requests only spool uploads and submit tasks, but large uploads can still
+# take a while to receive
+timeout = 120
+
+# app.py builds its MySQL pool and task executor at import time; importing it in
+# each worker keeps pooled connections and executor threads out of the master
+preload_app = False
@@ -2,6 +2,29 @@ import React, { useState } from 'react';
 import axios from 'axios';
 import './App.css';
 
+const API_URL = 'http://localhost:5001';
+const TASK_POLL_INTERVAL_MS = 2000;
+// Stop polling after an hour; the task keeps running on the backend
+const TASK_POLL_MAX_ATTEMPTS = 1800;
+
+// Poll a background task started by the backend until it finishes
+const waitForTask = async (taskId) => {
+  for (let attempt = 0; attempt < TASK_POLL_MAX_ATTEMPTS; attempt++) {
+    const res = await axios.get(`${API_URL}/task/${taskId}`);
+
+    if (res.data.status === 'completed') {
+      return res.data;
+    }
+    if (res.data.status === 'failed') {
+      throw new Error(res.data.error);
+    }
+
+    await new Promise((resolve) => setTimeout(resolve, TASK_POLL_INTERVAL_MS));
+  }
+
+  throw new Error(`Task ${taskId} is still running; check again later`);
+};
+
 function App() {
   const [jsonData, setJsonData] = useState('');
   const [file, setFile] = useState(null);
@@ -38,10 +61,11 @@ function App() {
     }
 
     try {
-      const res = await axios.post('http://localhost:5001/process-and-upload', formData);
+      const res = await axios.post(`${API_URL}/process-and-upload`, formData);
 
-      if (res.status === 200) {
-        alert(res.data.message || 'Upload successful!');
+      if (res.status === 202) {
+        const task = await waitForTask(res.data.task_id);
+        alert(task.message || 'Upload successful!');
         setJsonData('');
         setFile(null);
         setError('');
@@ -63,12 +87,13 @@ function App() {
     }
 
     try {
-      const res = await axios.post('http://localhost:5001/fetch-from-s3', {
+      const res = await axios.post(`${API_URL}/fetch-from-s3`, {
         file_key: migrationKey,
       });
 
-      if (res.status === 200) {
-        alert(res.data.message || 'Migration successful!');
+      if (res.status === 202) {
+        const task = await waitForTask(res.data.task_id);
+        alert(task.message || 'Migration successful!');
         setMigrationKey('');
         setError('');
       }